@@ -1,44 +1,212 @@
+import io
+import math
+import os
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from typing import Any
 
 import pandas as pd
 from django.core.management.base import BaseCommand, CommandError
-from django.db import connection
+from django.db import connection, models, transaction
 
 from app.models import Customer, Loan
 
+# Map CSV headers to model field names
+CUSTOMER_COLUMNS = {
+    "Customer ID": "customer_id",
+    "First Name": "first_name",
+    "Last Name": "last_name",
+    "Age": "age",
+    "Phone Number": "phone_number",
+    "Monthly Salary": "monthly_salary",
+    "Approved Limit": "approved_limit",
+}
+
+# Explicit dtypes so read_csv skips type inference
+CUSTOMER_DTYPES = {
+    "Customer ID": "int64",
+    "First Name": "str",
+    "Last Name": "str",
+    "Age": "int64",
+    "Phone Number": "int64",
+    "Monthly Salary": "int64",
+    "Approved Limit": "int64",
+}
+
+LOAN_COLUMNS = {
+    "Loan ID": "loan_id",
+    "Customer ID": "customer_id",
+    "Loan Amount": "loan_amount",
+    "Tenure": "tenure",
+    "Interest Rate": "interest_rate",
+    "Monthly payment": "monthly_repayment",
+    "EMIs paid on Time": "emis_paid_on_time",
+    "Date of Approval": "start_date",
+    "End Date": "end_date",
+}
+
+LOAN_DTYPES = {
+    "Customer ID": "int64",
+    "Loan ID": "int64",
+    "Loan Amount": "float64",
+    "Tenure": "int64",
+    "Interest Rate": "float64",
+    "Monthly payment": "float64",
+    "EMIs paid on Time": "int64",
+}
+
+LOAN_DATE_COLUMNS = ["Date of Approval", "End Date"]
+
+# Each worker holds its own Postgres connection, so keep the default small
+DEFAULT_WORKERS = min(os.cpu_count() or 1, 4)
+
+# Smaller loads are not worth an extra connection per chunk
+MIN_CHUNK_ROWS = 1000
+
+# Chunks commit independently, so a failed load can leave some rows behind
+PARTIAL_LOAD_NOTE = (
+    "Some rows may already have been loaded; existing rows are skipped, so "
+    "the command is safe to re-run."
+)
+
+
+def copy_dataframe(model: type[models.Model], df: pd.DataFrame) -> None:
+    """
+    Load rows into the model's table with Postgres COPY.
+
+    Rows are copied into a temporary staging table first so that rows whose
+    primary key already exists are skipped, as with ignore_conflicts.
+    """
+    table = model._meta.db_table
+    staging_table = f"{table}_staging"
+    columns = ", ".join(model._meta.get_field(name).column for name in df.columns)
+
+    buffer = io.StringIO()
+    df.to_csv(buffer, index=False, header=False)
+    buffer.seek(0)
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE TEMP TABLE {staging_table} (LIKE {table} INCLUDING DEFAULTS) ON COMMIT DROP;"
+        )
+        cursor.copy_expert(
+            f"COPY {staging_table} ({columns}) FROM STDIN WITH CSV", buffer
+        )
+        cursor.execute(
+            f"INSERT INTO {table} ({columns}) SELECT {columns} FROM {staging_table} ON CONFLICT DO NOTHING;"
+        )
+
+
+def copy_dataframe_parallel(
+    model: type[models.Model],
+    df: pd.DataFrame,
+    workers: int,
+    min_chunk_rows: int = MIN_CHUNK_ROWS,
+) -> None:
+    """
+    Split the rows into chunks and COPY each one over its own connection.
+    """
+
+    def copy_chunk(chunk: pd.DataFrame) -> None:
+        try:
+            copy_dataframe(model, chunk)
+        finally:
+            # Django connections are per thread; close this worker's one
+            connection.close()
+
+    # Chunks commit independently, so resolve duplicate keys up front and
+    # keep the first row in file order regardless of which thread wins
+    df = df.drop_duplicates(model._meta.pk.name, keep="first")
+
+    num_chunks = max(min(workers, len(df) // min_chunk_rows), 1)
+    chunk_size = max(math.ceil(len(df) / num_chunks), 1)
+    chunks = [df.iloc[i : i + chunk_size] for i in range(0, len(df), chunk_size)]
+
+    with ThreadPoolExecutor(max_workers=num_chunks) as executor:
+        # Consume the results so any worker exception is raised here
+        list(executor.map(copy_chunk, chunks))
+
+
+@contextmanager
+def deferred_indexes(model: type[models.Model]) -> Iterator[None]:
+    """
+    Drop the table's secondary indexes for the duration of a bulk load.
+
+    Only done when the table is empty: on a re-run, rebuilding every index
+    costs more than maintaining them, and DROP INDEX would lock out live
+    writes. Unique indexes (including the primary key) are kept because the
+    load relies on them for ON CONFLICT. The dropped indexes are rebuilt and
+    the table is analyzed afterwards, even if the load fails.
+    """
+    if model.objects.exists():
+        yield
+        return
+
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT indexrelid::regclass::text, pg_get_indexdef(indexrelid) FROM pg_index WHERE indrelid = %s::regclass AND NOT indisunique;",
+            [table],
+        )
+        indexes = cursor.fetchall()
+
+    # Track drops as they happen so a failed DROP only rebuilds what is gone
+    dropped = []
+    try:
+        with connection.cursor() as cursor:
+            for name, definition in indexes:
+                cursor.execute(f"DROP INDEX {name};")
+                dropped.append(definition)
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            for definition in dropped:
+                cursor.execute(definition)
+            cursor.execute(f"ANALYZE {table};")
+
 
 class Command(BaseCommand):
-    help = "Ingest data from Excel files into the database"
+    help = "Ingest customer and loan data from CSV files into the database"
+
+    def add_arguments(self, parser: Any) -> None:
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=DEFAULT_WORKERS,
+            help="Number of parallel database connections used to load rows",
+        )
+        parser.add_argument(
+            "--customer-file",
+            default="customer_data.csv",
+            help="CSV file with customer data",
+        )
+        parser.add_argument(
+            "--loan-file",
+            default="loan_data.csv",
+            help="CSV file with loan data",
+        )
 
     def handle(self, *args: Any, **kwargs: Any) -> None:
+        workers = max(kwargs["workers"], 1)
+
         # Define file paths
-        customer_file = "customer_data.xlsx - Sheet1.csv"
-        loan_file = "loan_data.xlsx - Sheet1.csv"
+        customer_file = kwargs["customer_file"]
+        loan_file = kwargs["loan_file"]
 
         # Ingest Customer Data
         try:
             self.stdout.write(f"Reading customer data from {customer_file}...")
-            # Use read_excel for .xlsx files
-            customer_df = pd.read_excel("customer_data.xlsx", sheet_name="Sheet1")
+            customer_df = pd.read_csv(customer_file, dtype=CUSTOMER_DTYPES)
 
             # Standardize column names
             customer_df.columns = customer_df.columns.str.strip()
+            customer_df.rename(columns=CUSTOMER_COLUMNS, inplace=True)
 
-            customers_to_create = []
-            for _, row in customer_df.iterrows():
-                customers_to_create.append(
-                    Customer(
-                        customer_id=row["Customer ID"],
-                        first_name=row["First Name"],
-                        last_name=row["Last Name"],
-                        age=row["Age"],
-                        phone_number=row["Phone Number"],
-                        monthly_salary=row["Monthly Salary"],
-                        approved_limit=row["Approved Limit"],
-                    )
+            with deferred_indexes(Customer):
+                copy_dataframe_parallel(
+                    Customer, customer_df[list(CUSTOMER_COLUMNS.values())], workers
                 )
-
-            Customer.objects.bulk_create(customers_to_create, ignore_conflicts=True)
             self.stdout.write(
                 self.style.SUCCESS("Successfully ingested customer data.")
             )
@@ -53,39 +221,39 @@ class Command(BaseCommand):
         except FileNotFoundError:
             raise CommandError(f"Error: {customer_file} not found.")
         except Exception as e:
-            raise CommandError(f"An error occurred during customer data ingestion: {e}")
+            raise CommandError(
+                f"An error occurred during customer data ingestion: {e}. "
+                f"{PARTIAL_LOAD_NOTE}"
+            )
 
         try:
             self.stdout.write(f"Reading loan data from {loan_file}...")
-            # Use read_excel for .xlsx files
-            loan_df = pd.read_excel("loan_data.xlsx", sheet_name="Sheet1")
+            loan_df = pd.read_csv(
+                loan_file, dtype=LOAN_DTYPES, parse_dates=LOAN_DATE_COLUMNS
+            )
 
             loan_df.columns = loan_df.columns.str.strip()
+            loan_df.rename(columns=LOAN_COLUMNS, inplace=True)
 
-            loans_to_create = []
-            for _, row in loan_df.iterrows():
-                if Customer.objects.filter(customer_id=row["Customer ID"]).exists():
-                    loans_to_create.append(
-                        Loan(
-                            loan_id=row["Loan ID"],
-                            customer_id=row["Customer ID"],
-                            loan_amount=row["Loan Amount"],
-                            tenure=row["Tenure"],
-                            interest_rate=row["Interest Rate"],
-                            monthly_repayment=row["Monthly payment"],
-                            emis_paid_on_time=row["EMIs paid on Time"],
-                            start_date=row["Date of Approval"],
-                            end_date=row["End Date"],
-                        )
-                    )
-                else:
-                    self.stdout.write(
-                        self.style.WARNING(
-                            f"Customer with ID {row['Customer ID']} not found. Skipping loan {row['Loan ID']}."
-                        )
+            # Fetch all customer IDs once instead of querying per loan row
+            valid_ids = set(Customer.objects.values_list("customer_id", flat=True))
+            has_customer = loan_df["customer_id"].isin(valid_ids)
+
+            for customer_id, loan_id in loan_df.loc[
+                ~has_customer, ["customer_id", "loan_id"]
+            ].itertuples(index=False, name=None):
+                self.stdout.write(
+                    self.style.WARNING(
+                        f"Customer with ID {customer_id} not found. Skipping loan {loan_id}."
                     )
+                )
 
-            Loan.objects.bulk_create(loans_to_create, ignore_conflicts=True)
+            with deferred_indexes(Loan):
+                copy_dataframe_parallel(
+                    Loan,
+                    loan_df.loc[has_customer, list(LOAN_COLUMNS.values())],
+                    workers,
+                )
             self.stdout.write(self.style.SUCCESS("Successfully ingested loan data."))
 
             self.stdout.write("Resetting loan ID sequence...")
@@ -98,4 +266,7 @@ class Command(BaseCommand):
         except FileNotFoundError:
             raise CommandError(f"Error: {loan_file} not found.")
         except Exception as e:
-            raise CommandError(f"An error occurred during loan data ingestion: {e}")
+            raise CommandError(
+                f"An error occurred during loan data ingestion: {e}. "
+                f"{PARTIAL_LOAD_NOTE}"
+            )
@@ -1,12 +1,22 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
+
+# Postgres integer and bigint column ranges
+INT_MAX = 2147483647
+BIGINT_MIN = -9223372036854775808
+BIGINT_MAX = 9223372036854775807
+
+# Largest income whose approved limit (36x, rounded to a lakh) fits an integer
+MAX_MONTHLY_INCOME = 59651388
 
 
 class RegisterCustomerSchema(BaseModel):
-    first_name: str
-    last_name: str
-    age: int = Field(..., gt=0)
-    monthly_income: float = Field(..., gt=0)
-    phone_number: int
+    model_config = ConfigDict(str_strip_whitespace=True)
+
+    first_name: str = Field(..., min_length=1, max_length=255)
+    last_name: str = Field(..., min_length=1, max_length=255)
+    age: int = Field(..., gt=0, le=INT_MAX)
+    monthly_income: int = Field(..., gt=0, le=MAX_MONTHLY_INCOME)
+    phone_number: int = Field(..., ge=BIGINT_MIN, le=BIGINT_MAX)
 
 
 class CheckEligibilitySchema(BaseModel):
@@ -1,6 +1,5 @@
 from datetime import date
 
-from dateutil.relativedelta import relativedelta
 from rest_framework import serializers
 
 from .models import Customer, Loan
@@ -48,18 +47,21 @@ class ViewLoansSerializer(serializers.ModelSerializer):
         ]
 
     def get_repayments_left(self, obj: Loan) -> int:
+        # Use the value annotated by the view when available. The fallback
+        # below keeps the serializer usable on plain Loan querysets.
+        if hasattr(obj, "repayments_left"):
+            return obj.repayments_left
+
         # Calculate the number of EMIs left to be paid.
-        today = date.today()
+        today = self.context.get("today") or date.today()
         end_date = obj.end_date
 
         if today > end_date:
             return 0
 
-        # Calculate the difference in months
-        delta = relativedelta(end_date, today)
-        months_left = delta.years * 12 + delta.months
-
-        if delta.days > 0:
+        # Calculate the difference in months, counting a partial month as one
+        months_left = (end_date.year - today.year) * 12 + (end_date.month - today.month)
+        if end_date.day > today.day:
             months_left += 1
 
         return months_left
@@ -1,11 +1,24 @@
+import tempfile
 from datetime import date
+from io import StringIO
+from pathlib import Path
+from unittest import mock, skipUnless
 
+import pandas as pd
 from dateutil.relativedelta import relativedelta  # Import relativedelta
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase
 
+from .management.commands.ingest_data import (
+    copy_dataframe_parallel,
+    deferred_indexes,
+)
 from .models import Customer, Loan
+from .serializers import ViewLoansSerializer
 
 
 class CustomerAPITests(APITestCase):
@@ -50,6 +63,54 @@ class CustomerAPITests(APITestCase):
         response = self.client.post(url, data, format="json")
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
+    def test_register_customer_out_of_range(self):
+        url = reverse("register")
+        valid = {
+            "first_name": "Jane",
+            "last_name": "Doe",
+            "age": 28,
+            "monthly_income": 75000,
+            "phone_number": 9876543210,
+        }
+        for field, value in [
+            ("age", 2**31),
+            ("phone_number", 2**63),
+            ("monthly_income", 59651389),
+            ("first_name", ""),
+            ("first_name", "   "),
+            ("last_name", ""),
+        ]:
+            with self.subTest(field=field, value=value):
+                response = self.client.post(url, {**valid, field: value}, format="json")
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Customer.objects.count(), 1)
+
+    def test_register_customer_strips_names(self):
+        url = reverse("register")
+        data = {
+            "first_name": "  Jane ",
+            "last_name": " Doe",
+            "age": 28,
+            "monthly_income": 75000,
+            "phone_number": 9876543210,
+        }
+        response = self.client.post(url, data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["name"], "Jane Doe")
+
+    def test_register_customer_max_income(self):
+        url = reverse("register")
+        data = {
+            "first_name": "Jane",
+            "last_name": "Doe",
+            "age": 28,
+            "monthly_income": 59651388,
+            "phone_number": 9876543210,
+        }
+        response = self.client.post(url, data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["approved_limit"], 2147400000)
+
     def test_check_eligibility_approved(self):
         customer = Customer.objects.create(
             first_name="Test",
@@ -160,4 +221,247 @@ class CustomerAPITests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data), 1)
         self.assertEqual(response.data[0]["loan_id"], self.loan.loan_id)
-        self.assertIn("repayments_left", response.data[0])
+        self.assertEqual(response.data[0]["repayments_left"], 6)
+
+    @mock.patch("app.views.date")
+    def test_view_customer_loans_repayments_left(self, mock_date):
+        mock_date.today.return_value = date(2025, 1, 15)
+        customer = Customer.objects.create(
+            first_name="Many",
+            last_name="Loans",
+            age=45,
+            monthly_salary=90000,
+            phone_number=7777777777,
+            approved_limit=3200000,
+        )
+        expected = {
+            date(2024, 12, 1): 0,  # Already ended
+            date(2025, 7, 15): 6,  # Same day of month
+            date(2025, 7, 20): 7,  # Later day counts a partial month
+            date(2025, 7, 10): 6,  # Earlier day
+        }
+        loans = {
+            Loan.objects.create(
+                customer=customer,
+                loan_amount=10000,
+                tenure=12,
+                interest_rate=10,
+                monthly_repayment=879.16,
+                emis_paid_on_time=0,
+                start_date=date(2024, 1, 1),
+                end_date=end_date,
+            ).loan_id: months
+            for end_date, months in expected.items()
+        }
+
+        url = reverse("view-loans", kwargs={"customer_id": customer.customer_id})
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            {loan["loan_id"]: loan["repayments_left"] for loan in response.data},
+            loans,
+        )
+
+    def test_view_customer_loans_empty(self):
+        customer = Customer.objects.create(
+            first_name="No",
+            last_name="Loans",
+            age=25,
+            monthly_salary=40000,
+            phone_number=4444444444,
+            approved_limit=1400000,
+        )
+        url = reverse("view-loans", kwargs={"customer_id": customer.customer_id})
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, [])
+
+    def test_view_customer_loans_not_found(self):
+        url = reverse("view-loans", kwargs={"customer_id": 999})
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class ViewLoansSerializerTests(TestCase):
+    def setUp(self):
+        self.customer = Customer.objects.create(
+            first_name="Plain",
+            last_name="Loan",
+            age=30,
+            monthly_salary=50000,
+            phone_number=8888888888,
+            approved_limit=1800000,
+        )
+
+    def repayments_left(self, today, end_date):
+        # Loans created directly carry no repayments_left annotation
+        loan = Loan.objects.create(
+            customer=self.customer,
+            loan_amount=10000,
+            tenure=12,
+            interest_rate=10,
+            monthly_repayment=879.16,
+            emis_paid_on_time=0,
+            start_date=date(2024, 1, 1),
+            end_date=end_date,
+        )
+        serializer = ViewLoansSerializer(loan, context={"today": today})
+        return serializer.data["repayments_left"]
+
+    def test_repayments_left_ended(self):
+        self.assertEqual(self.repayments_left(date(2025, 1, 15), date(2024, 12, 1)), 0)
+
+    def test_repayments_left_same_day(self):
+        self.assertEqual(self.repayments_left(date(2025, 1, 15), date(2025, 7, 15)), 6)
+
+    def test_repayments_left_partial_month(self):
+        self.assertEqual(self.repayments_left(date(2025, 1, 15), date(2025, 7, 20)), 7)
+
+    def test_repayments_left_month_end_clamp(self):
+        self.assertEqual(self.repayments_left(date(2025, 1, 31), date(2025, 2, 28)), 1)
+
+
+@skipUnless(connection.vendor == "postgresql", "Ingest uses Postgres COPY")
+class IngestDataTests(TransactionTestCase):
+    def loan_indexes(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT indexname, indexdef FROM pg_indexes WHERE tablename = 'app_loan';"
+            )
+            return set(cursor.fetchall())
+
+    def test_deferred_indexes_restored_after_load(self):
+        before = self.loan_indexes()
+        with deferred_indexes(Loan):
+            # Only the primary key survives while loading into an empty table
+            self.assertLess(self.loan_indexes(), before)
+        self.assertEqual(self.loan_indexes(), before)
+
+    def test_deferred_indexes_restored_after_error(self):
+        before = self.loan_indexes()
+        with self.assertRaises(RuntimeError):
+            with deferred_indexes(Loan):
+                raise RuntimeError("load failed")
+        self.assertEqual(self.loan_indexes(), before)
+
+    def test_deferred_indexes_kept_for_populated_table(self):
+        customer = Customer.objects.create(
+            first_name="Existing",
+            last_name="Loan",
+            age=30,
+            monthly_salary=50000,
+            phone_number=9999999999,
+            approved_limit=1800000,
+        )
+        Loan.objects.create(
+            customer=customer,
+            loan_amount=10000,
+            tenure=12,
+            interest_rate=10,
+            monthly_repayment=879.16,
+            emis_paid_on_time=0,
+            start_date=date(2024, 1, 1),
+            end_date=date(2025, 1, 1),
+        )
+        before = self.loan_indexes()
+        with deferred_indexes(Loan):
+            self.assertEqual(self.loan_indexes(), before)
+        self.assertEqual(self.loan_indexes(), before)
+
+    def test_ingest_data_command(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            customer_file = Path(tmp) / "customers.csv"
+            customer_file.write_text(
+                "Customer ID,First Name,Last Name,Age,Phone Number,Monthly Salary,Approved Limit\n"
+                "10,Aaron,Garcia,63,9629317944,50000,4500000\n"
+                "11,Abbey,Gonzalez,20,9278790909,33000,1400000\n"
+            )
+            loan_file = Path(tmp) / "loans.csv"
+            loan_file.write_text(
+                "Customer ID,Loan ID,Loan Amount,Tenure,Interest Rate,Monthly payment,EMIs paid on Time,Date of Approval,End Date\n"
+                "10,20,900000,129,8.2,15344,114,2017-03-09,2027-12-09\n"
+                "99,21,300000,3,13.46,100000,3,2011-09-06,2011-12-06\n"
+                "11,22,200000,147,12.39,5526,126,2015-07-13,2027-10-13\n"
+            )
+            out = StringIO()
+            call_command(
+                "ingest_data",
+                customer_file=str(customer_file),
+                loan_file=str(loan_file),
+                stdout=out,
+            )
+
+        customer = Customer.objects.get(pk=10)
+        self.assertEqual(customer.phone_number, 9629317944)
+        self.assertEqual(customer.approved_limit, 4500000)
+
+        self.assertEqual(set(Loan.objects.values_list("pk", flat=True)), {20, 22})
+        loan = Loan.objects.get(pk=20)
+        self.assertEqual(loan.customer_id, 10)
+        self.assertEqual(loan.interest_rate, 8.2)
+        self.assertEqual(loan.start_date, date(2017, 3, 9))
+        self.assertEqual(loan.end_date, date(2027, 12, 9))
+        self.assertIn(
+            "Customer with ID 99 not found. Skipping loan 21.", out.getvalue()
+        )
+
+        # Sequences continue after the ingested IDs
+        new_customer = Customer.objects.create(
+            first_name="New",
+            last_name="Customer",
+            age=30,
+            monthly_salary=50000,
+            phone_number=1234567890,
+            approved_limit=1800000,
+        )
+        self.assertEqual(new_customer.customer_id, 12)
+        new_loan = Loan.objects.create(
+            customer=new_customer,
+            loan_amount=10000,
+            tenure=12,
+            interest_rate=10,
+            monthly_repayment=879.16,
+            emis_paid_on_time=0,
+            start_date=date(2025, 1, 1),
+            end_date=date(2026, 1, 1),
+        )
+        self.assertEqual(new_loan.loan_id, 23)
+
+    def test_duplicate_loan_ids_keep_first_row(self):
+        first = Customer.objects.create(
+            first_name="First",
+            last_name="Owner",
+            age=30,
+            monthly_salary=50000,
+            phone_number=5555555555,
+            approved_limit=1800000,
+        )
+        second = Customer.objects.create(
+            first_name="Second",
+            last_name="Owner",
+            age=30,
+            monthly_salary=50000,
+            phone_number=6666666666,
+            approved_limit=1800000,
+        )
+        row = {
+            "loan_id": 7547,
+            "loan_amount": 300000.0,
+            "tenure": 75,
+            "interest_rate": 11.69,
+            "monthly_repayment": 7765.0,
+            "emis_paid_on_time": 43,
+            "start_date": date(2014, 1, 23),
+            "end_date": date(2020, 4, 23),
+        }
+        loan_df = pd.DataFrame(
+            [
+                {**row, "customer_id": first.customer_id},
+                {**row, "customer_id": second.customer_id},
+            ]
+        )
+
+        # Put each duplicate in its own chunk
+        copy_dataframe_parallel(Loan, loan_df, workers=2, min_chunk_rows=1)
+
+        self.assertEqual(Loan.objects.get(pk=7547).customer_id, first.customer_id)
@@ -1,7 +1,8 @@
 from datetime import date
 
 from dateutil.relativedelta import relativedelta
-from django.db.models import Sum
+from django.db.models import Case, IntegerField, Prefetch, Value, When
+from django.db.models.functions import ExtractMonth, ExtractYear
 from pydantic import ValidationError
 from rest_framework import status
 from rest_framework.decorators import api_view
@@ -10,11 +11,29 @@ from rest_framework.response import Response
 
 from .models import Customer, Loan
 from .schemas import CheckEligibilitySchema, CreateLoanSchema, RegisterCustomerSchema
-from .serializers import (
-    CustomerSerializer,
-    LoanDetailSerializer,
-    LoanSerializer,
-    ViewLoansSerializer,
+from .serializers import LoanDetailSerializer, ViewLoansSerializer
+
+# Bind the compiled pydantic-core validators once at import time
+register_customer_validator = RegisterCustomerSchema.__pydantic_validator__
+check_eligibility_validator = CheckEligibilitySchema.__pydantic_validator__
+create_loan_validator = CreateLoanSchema.__pydantic_validator__
+
+# Loan columns read by the eligibility calculations
+ELIGIBILITY_LOAN_FIELDS = (
+    "loan_amount",
+    "emis_paid_on_time",
+    "tenure",
+    "start_date",
+    "end_date",
+    "monthly_repayment",
+)
+
+# Customers with the eligibility loan columns prefetched into loan_set
+customers_with_loans = Customer.objects.prefetch_related(
+    Prefetch(
+        "loan_set",
+        queryset=Loan.objects.only("customer", *ELIGIBILITY_LOAN_FIELDS),
+    )
 )
 
 
@@ -25,7 +44,7 @@ def register_customer(request: Request) -> Response:
             {"error": "Invalid data format"}, status=status.HTTP_400_BAD_REQUEST
         )
     try:
-        validated_data = RegisterCustomerSchema(**request.data)
+        validated_data = register_customer_validator.validate_python(request.data)
     except ValidationError as e:
         return Response(e.errors(), status=status.HTTP_400_BAD_REQUEST)
 
@@ -40,55 +59,44 @@ def register_customer(request: Request) -> Response:
         "approved_limit": approved_limit,
     }
 
-    serializer = CustomerSerializer(data=customer_data)
-
-    if serializer.is_valid():
-        customer = serializer.save()
-        response_data = {
-            "customer_id": customer.customer_id,
-            "name": f"{customer.first_name} {customer.last_name}",
-            "age": customer.age,
-            "monthly_income": customer.monthly_salary,
-            "approved_limit": customer.approved_limit,
-            "phone_number": customer.phone_number,
-        }
-        return Response(response_data, status=status.HTTP_201_CREATED)
-    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    # The schema has already validated the payload, so skip the serializer
+    customer = Customer.objects.create(**customer_data)
+    response_data = {
+        "customer_id": customer.customer_id,
+        "name": f"{customer.first_name} {customer.last_name}",
+        "age": customer.age,
+        "monthly_income": customer.monthly_salary,
+        "approved_limit": customer.approved_limit,
+        "phone_number": customer.phone_number,
+    }
+    return Response(response_data, status=status.HTTP_201_CREATED)
 
 
-def calculate_credit_score(customer: Customer) -> int:
+def calculate_credit_score(customer: Customer, loans: list[Loan], today: date) -> int:
     """
-    Calculates the credit score for a given customer.
+    Calculates the credit score for a given customer from their loans.
     """
-    loans = Loan.objects.filter(customer=customer)
+    current_loans = [loan for loan in loans if loan.end_date >= today]
 
     # Sum of current loans vs approved limit (Hard rejection)
-    current_loans = loans.filter(end_date__gte=date.today())
-    current_loan_sum_agg = current_loans.aggregate(total=Sum("loan_amount"))
-    current_loan_sum = current_loan_sum_agg.get("total") or 0
+    current_loan_sum = sum(loan.loan_amount for loan in current_loans)
     if current_loan_sum > customer.approved_limit:
         return 0
 
     # Past Loans paid on time
-    paid_on_time_emis_agg = loans.aggregate(total=Sum("emis_paid_on_time"))
-    paid_on_time_emis = paid_on_time_emis_agg.get("total") or 0
-    total_emis_agg = loans.aggregate(total=Sum("tenure"))
-    total_emis = total_emis_agg.get("total") or 0
+    paid_on_time_emis = sum(loan.emis_paid_on_time for loan in loans)
+    total_emis = sum(loan.tenure for loan in loans)
     paid_on_time_weight = (paid_on_time_emis / total_emis) * 30 if total_emis > 0 else 0
 
     # No of loans taken in past
-    num_loans = loans.count()
-    num_loans_weight = min(num_loans * 5, 20)
+    num_loans_weight = min(len(loans) * 5, 20)
 
     # Loan activity in current year
-    current_year = date.today().year
-    loan_activity_weight = min(
-        loans.filter(start_date__year=current_year).count() * 5, 20
-    )
+    current_year_loans = sum(1 for loan in loans if loan.start_date.year == today.year)
+    loan_activity_weight = min(current_year_loans * 5, 20)
 
     # Loan approved volume
-    total_loan_amount_agg = loans.aggregate(total=Sum("loan_amount"))
-    total_loan_amount = total_loan_amount_agg.get("total") or 0
+    total_loan_amount = sum(loan.loan_amount for loan in loans)
     loan_volume_weight = 0
     if customer.approved_limit > 0 and total_loan_amount <= customer.approved_limit:
         loan_volume_weight = min((total_loan_amount / customer.approved_limit) * 15, 15)
@@ -117,10 +125,9 @@ def calculate_monthly_installment(
     if monthly_interest_rate == 0:
         return loan_amount / tenure
 
-    numerator = (
-        loan_amount * monthly_interest_rate * ((1 + monthly_interest_rate) ** tenure)
-    )
-    denominator = ((1 + monthly_interest_rate) ** tenure) - 1
+    factor = (1 + monthly_interest_rate) ** tenure
+    numerator = loan_amount * monthly_interest_rate * factor
+    denominator = factor - 1
 
     if denominator == 0:
         return float("inf")
@@ -129,12 +136,16 @@ def calculate_monthly_installment(
 
 
 def get_eligibility_status(
-    customer: Customer, loan_amount: float, interest_rate: float, tenure: int
+    customer: Customer,
+    loans: list[Loan],
+    loan_amount: float,
+    interest_rate: float,
+    tenure: int,
+    today: date,
 ) -> dict:
-    current_emis_agg = Loan.objects.filter(
-        customer=customer, end_date__gte=date.today()
-    ).aggregate(total=Sum("monthly_repayment"))
-    current_emis = current_emis_agg.get("total") or 0
+    current_emis = sum(
+        loan.monthly_repayment for loan in loans if loan.end_date >= today
+    )
 
     if current_emis > customer.monthly_salary * 0.5:
         return {
@@ -143,7 +154,7 @@ def get_eligibility_status(
             "monthly_installment": 0,
         }
 
-    credit_score = calculate_credit_score(customer)
+    credit_score = calculate_credit_score(customer, loans, today)
     approval = False
     corrected_interest_rate = interest_rate
 
@@ -174,12 +185,12 @@ def get_eligibility_status(
 @api_view(["POST"])
 def check_eligibility(request: Request) -> Response:
     try:
-        validated_data = CheckEligibilitySchema(**request.data)
+        validated_data = check_eligibility_validator.validate_python(request.data)
     except ValidationError as e:
         return Response(e.errors(), status=status.HTTP_400_BAD_REQUEST)
 
     try:
-        customer = Customer.objects.get(pk=validated_data.customer_id)
+        customer = customers_with_loans.get(pk=validated_data.customer_id)
     except Customer.DoesNotExist:
         return Response(
             {"error": "Customer not found"}, status=status.HTTP_404_NOT_FOUND
@@ -187,9 +198,11 @@ def check_eligibility(request: Request) -> Response:
 
     eligibility = get_eligibility_status(
         customer,
+        list(customer.loan_set.all()),
         validated_data.loan_amount,
         validated_data.interest_rate,
         validated_data.tenure,
+        date.today(),
     )
 
     response_data = {
@@ -208,22 +221,25 @@ def check_eligibility(request: Request) -> Response:
 @api_view(["POST"])
 def create_loan(request: Request) -> Response:
     try:
-        validated_data = CreateLoanSchema(**request.data)
+        validated_data = create_loan_validator.validate_python(request.data)
     except ValidationError as e:
         return Response(e.errors(), status=status.HTTP_400_BAD_REQUEST)
 
     try:
-        customer = Customer.objects.get(pk=validated_data.customer_id)
+        customer = customers_with_loans.get(pk=validated_data.customer_id)
     except Customer.DoesNotExist:
         return Response(
             {"error": "Customer not found"}, status=status.HTTP_404_NOT_FOUND
         )
 
+    today = date.today()
     eligibility = get_eligibility_status(
         customer,
+        list(customer.loan_set.all()),
         validated_data.loan_amount,
         validated_data.interest_rate,
         validated_data.tenure,
+        today,
     )
 
     if not eligibility["approval"]:
@@ -238,11 +254,11 @@ def create_loan(request: Request) -> Response:
             status=status.HTTP_200_OK,
         )
 
-    start_date = date.today()
+    start_date = today
     end_date = start_date + relativedelta(months=validated_data.tenure)
 
     loan_data = {
-        "customer": customer.pk,
+        "customer": customer,
         "loan_amount": validated_data.loan_amount,
         "interest_rate": eligibility["corrected_interest_rate"],
         "tenure": validated_data.tenure,
@@ -252,21 +268,17 @@ def create_loan(request: Request) -> Response:
         "end_date": end_date,
     }
 
-    serializer = LoanSerializer(data=loan_data)
-    if serializer.is_valid():
-        loan = serializer.save()
-        return Response(
-            {
-                "loan_id": loan.loan_id,
-                "customer_id": validated_data.customer_id,
-                "loan_approved": True,
-                "message": "Loan approved successfully!",
-                "monthly_installment": eligibility["monthly_installment"],
-            },
-            status=status.HTTP_201_CREATED,
-        )
-
-    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    loan = Loan.objects.create(**loan_data)
+    return Response(
+        {
+            "loan_id": loan.loan_id,
+            "customer_id": validated_data.customer_id,
+            "loan_approved": True,
+            "message": "Loan approved successfully!",
+            "monthly_installment": eligibility["monthly_installment"],
+        },
+        status=status.HTTP_201_CREATED,
+    )
 
 
 @api_view(["GET"])
@@ -282,11 +294,25 @@ def view_loan(request: Request, loan_id: int) -> Response:
 
 @api_view(["GET"])
 def view_customer_loans(request: Request, customer_id: int) -> Response:
-    if not Customer.objects.filter(pk=customer_id).exists():
+    today = date.today()
+    # Months left, rounding a partial month up; loans past their end date have 0
+    loans = list(
+        Loan.objects.filter(customer_id=customer_id).annotate(
+            repayments_left=Case(
+                When(end_date__lt=today, then=Value(0)),
+                default=(ExtractYear("end_date") - today.year) * 12
+                + (ExtractMonth("end_date") - today.month)
+                + Case(When(end_date__day__gt=today.day, then=Value(1)), default=0),
+                output_field=IntegerField(),
+            )
+        )
+    )
+
+    # Only an empty result needs a second query to tell 404 from no loans
+    if not loans and not Customer.objects.filter(pk=customer_id).exists():
         return Response(
             {"error": "Customer not found"}, status=status.HTTP_404_NOT_FOUND
         )
 
-    loans = Loan.objects.filter(customer_id=customer_id)
-    serializer = ViewLoansSerializer(loans, many=True)
+    serializer = ViewLoansSerializer(loans, many=True, context={"today": today})
     return Response(serializer.data, status=status.HTTP_200_OK)
@@ -1,14 +1,20 @@
 # Gunicorn configuration file
 import multiprocessing
+import os
 
 # Server socket
 bind = "0.0.0.0:8000"
 backlog = 2048
 
 # Worker processes
-workers = multiprocessing.cpu_count() * 2 + 1
-worker_class = "sync"
-worker_connections = 1000
+# Views are I/O-bound on Postgres, so threads serve requests while others
+# wait on the database instead of blocking a whole process.
+# Each thread keeps its own persistent Postgres connection (CONN_MAX_AGE), so
+# workers * threads must stay below the server's max_connections (100 by
+# default), leaving room for ingest and admin sessions.
+workers = int(os.environ.get("GUNICORN_WORKERS", min(multiprocessing.cpu_count(), 4)))
+worker_class = "gthread"
+threads = int(os.environ.get("GUNICORN_THREADS", 4))
 timeout = 30
 keepalive = 2
 